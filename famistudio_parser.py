@@ -1,50 +1,105 @@
 # Parser for FamiStudio text file format
 
 import re
+import sys
 import numpy
 from io import TextIOWrapper
+from json.encoder import encode_basestring
+from typing import Iterable, Iterator, TextIO
 from typing_extensions import Self
+from configargparse import ArgParser
 
 # Reference:
 # https://famistudio.org/doc/export/#famistudio-text
 
 
-# Read a line and extract the object type and its attributes to populate a dictionary
-class LineReader:
+def main():
+    parser = ArgParser(
+        prog="famistudio_parser",
+        description="Convert a FamiStudio text export into JSON.")
 
-    # construct regex parsers
-    def __init__(self) -> None:
-        self.pattern_node = re.compile(r'\w+')
-        self.pattern_attr = re.compile(r'(\w+)="((""|[^"])*)"')
+    parser.add_argument('-c', '--config',
+        is_config_file=True,
+        help="config file path")
+
+    parser.add_argument('-i', '--input',
+        dest='input',
+        required=True,
+        help="The FamiStudio text export to convert (.txt)")
+
+    parser.add_argument('--compact',
+        dest='compact',
+        default=False,
+        action='store_true',
+        help="Write the JSON without any whitespace between tokens")
 
+    args = parser.parse_args()
 
-    # read a file line by line and return a list of nodes with their attributes
-    def read_file(self, file: TextIOWrapper) -> list[tuple[str, dict[str, str]]]:
-        lines = []
-        for line in file:
-            if entry := self.read_line(line):
-                lines.append(entry)
-        return lines
+    # read the file and generate the tree on the fly
+    try:
+        with open(args.input, 'r', encoding='utf-8', buffering=1 << 20) as file:
+            root = TreeGenerator().hierarchize(LineReader().iter_entries(file))
+    except Exception as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    # write the tree as JSON
+    root.write_json(sys.stdout, (',', ':') if args.compact else (', ', ': '))
+    sys.stdout.write('\n')
+
+
+# regex parsers shared by every line reader
+# attribute values are matched with an unrolled loop rather than an alternation per character
+_PATTERN_NODE = re.compile(r'\w+')
+_PATTERN_ATTR = re.compile(r'(\w+)="([^"\n]*(?:""[^"\n]*)*)"')
+
+# the node type of a line, the first word found, followed by the rest of the line
+_PATTERN_LINE = re.compile(r'^[^\w\n]*(\w+)(.*)', re.MULTILINE)
+
+
+# Read a line and extract the object type and its attributes to populate a dictionary
+class LineReader:
+
+    # read a whole file in a single pass and yield the nodes with their attributes,
+    # each line is only parsed once the previous entry has been consumed
+    def iter_entries(self, file: TextIOWrapper) -> Iterator[tuple[str, dict[str, str]]]:
+        for found in _PATTERN_LINE.finditer(file.read()):
+            yield (sys.intern(found.group(1)), self._read_attributes(found.group(2)))
 
 
     # read a single line and produce a dictionary
     def read_line(self, line: str) -> tuple[str, dict[str, str]] | None:
-        if found := self.pattern_node.search(line):
-
-            # compose a dictionary containing the attributes
-            attributes = {}
-            for attr in self.pattern_attr.finditer(line, found.end(0)):
-                attributes[attr.group(1)] = attr.group(2).replace('""', '\\"')
+        if found := _PATTERN_NODE.search(line):
+            attributes = self._read_attributes(line, found.end(0))
 
             # return the node type and its attributes
-            return (found.group(0), attributes)
+            return (sys.intern(found.group(0)), attributes)
         else:
             return None
 
 
+    # compose a dictionary containing the attributes,
+    # only unescape the doubled quotes of the values that contain some
+    # names and values repeat a lot across a song so they are interned
+    def _read_attributes(self, text: str, pos: int = 0) -> dict[str, str]:
+        attributes = {}
+        for (key, value) in _PATTERN_ATTR.findall(text, pos):
+            if '""' in value:
+                value = value.replace('""', '"')
+            attributes[sys.intern(key)] = sys.intern(value)
+        return attributes
+
+
+# children of the nodes that cannot have any, shared since it is never modified
+_EMPTY_CHILDREN: dict[str, list] = {}
+
+
 # A node of a tree
 class Node:
 
+    # a song holds a lot of nodes, avoid allocating a dictionary for each of them
+    __slots__ = ('parent', 'name', 'attributes', 'children')
+
     # generate a node with a type name, attributes and definition
     def __init__(self, name: str, attr: dict[str, str], relations: list[str]) -> None:
         # the parent of this node
@@ -55,9 +110,7 @@ class Node:
         self.attributes = attr
 
         # create a list for each type of children expected
-        self.children = {}
-        for key in relations:
-            self.children[key] = []
+        self.children = {key: [] for key in relations} if relations else _EMPTY_CHILDREN
 
 
     # add a child node to this node
@@ -76,6 +129,29 @@ class Node:
             return False
 
 
+    # write the node and its children as JSON, one node at a time
+    def write_json(self, out: TextIO, separators: tuple[str, str] = (', ', ': ')) -> None:
+        (item_sep, key_sep) = separators
+
+        # write the attributes of the node, escaping the raw values
+        out.write('{')
+        head = ''
+        for (key, value) in self.attributes.items():
+            out.write('{}"{}"{}{}'.format(head, key, key_sep, encode_basestring(value)))
+            head = item_sep
+
+        # write each list of children
+        for (key, children) in self.children.items():
+            out.write('{}"{}"{}['.format(head, key, key_sep))
+            head = item_sep
+            for (index, child) in enumerate(children):
+                if index > 0:
+                    out.write(item_sep)
+                child.write_json(out, separators)
+            out.write(']')
+        out.write('}')
+
+
     # display the content of the node in readable format
     def __repr__(self) -> str:
         return self._to_string(0)
@@ -116,13 +192,16 @@ class TreeGenerator:
             }
         }
 
-        # for each node type, specify the expected children types
-        self.relations = {}
-        self._get_relations('Project', tree_structure['Project'])
+        # for each node type, specify the expected children types,
+        # the type of the parent it should be attached to and its depth in the tree
+        self.relations: dict[str, list[str]] = {}
+        self.parents: dict[str, str] = {}
+        self.depths: dict[str, int] = {}
+        self._get_relations('Project', tree_structure['Project'], 0)
 
 
     # get the relations
-    def _get_relations(self, node: str, entries: dict | None) -> None:
+    def _get_relations(self, node: str, entries: dict | None, depth: int) -> None:
         children = []
 
         # does the node have children?
@@ -130,8 +209,10 @@ class TreeGenerator:
             # if so add them to the relations map
             for (key, value) in entries.items():
                 children.append(key)
-                self._get_relations(key, value)
+                self.parents[key] = node
+                self._get_relations(key, value, depth + 1)
         self.relations[node] = children
+        self.depths[node] = depth
 
 
     # display the relations rules
@@ -143,29 +224,36 @@ class TreeGenerator:
 
 
     # apply the hierachy template to the entries provided
-    def hierarchize(self, entries: list[tuple[str, dict[str, str]]]) -> Node:
+    def hierarchize(self, entries: Iterable[tuple[str, dict[str, str]]]) -> Node:
         root_node: Node | None = None
-        cached_node: Node | None = None
+
+        # the branch of the tree being populated, each node is stored at its depth
+        # and the depths above the root are left empty
+        branch: list[Node | None] = []
 
         # iterate over each of the entries
         for (entry_type, entry_attr) in entries:
 
             # create a node given the current entry
-            node = Node(entry_type, entry_attr, self.relations[entry_type])
+            node  = Node(entry_type, entry_attr, self.relations[entry_type])
+            depth = self.depths[entry_type]
+
+            # we already have a root
+            if root_node is not None:
+                # the parent can only be the node of the branch right above the new one
+                parent = branch[depth - 1] if 0 < depth <= len(branch) else None
+                if parent is None or parent.name != self.parents[entry_type]:
+                    raise Exception("Could not find where to store the entry in the tree:\n{}".format(node))
+                parent.add_child(node)
 
-            # we already cached a node
-            if isinstance(cached_node, Node):
-                # try to add the new node to the cached node or any of its ancestors
-                while not cached_node.add_child(node):
-                    cached_node = cached_node.parent
-                    if cached_node is None:
-                        raise Exception("Could not find where to store the entry in the tree:\n{}".format(node))
-                cached_node = node
+                # the new node replaces the end of the branch
+                del branch[depth:]
+                branch.append(node)
 
             # if it is the first node, it is the root
             else:
                 root_node = node
-                cached_node = node
+                branch = [None] * depth + [node]
 
         # At that point, we are expecting to return the root of the tree generated
         if root_node is None:
@@ -174,42 +262,46 @@ class TreeGenerator:
             return root_node
 
 
+# every note a note reader accepts, a letter, an optional sharp and an octave,
+# with its location in the frequency table: two columns per letter and the sharp in the odd one
+_NOTES = {
+    letter + sharp + octave: (int(octave) - 1, 2 * index + len(sharp))
+    for (index, letter) in enumerate('ABCDEFG')
+    for sharp  in ('', '#')
+    for octave in '12345678' }
+
+
 # Read a string representing a note to get the Hertz
 class NoteReader:
 
     # construct a note reader
     def __init__(self) -> None:
-        self.pattern = re.compile("^[A-G]#?[1-8]$")
-
         # generate a look up table to store frequency values
         octaves_count = 8
         notes_per_octave = 12
-        self.frequencies = numpy.zeros((octaves_count, notes_per_octave), dtype=numpy.float64)
 
-        # for each note in the octaves, compute the corresponding frequency
-        oct_start = 55.0
-        for o in range(octaves_count):
-            for n in range(notes_per_octave):
-                self.frequencies[o, n] = oct_start * (2.0 ** (n / float(notes_per_octave)))
-            oct_start *= 2.0
+        # each octave starts at twice the frequency of the previous one,
+        # each note of an octave is a semitone above the previous one
+        oct_starts = 55.0 * (2.0 ** numpy.arange(octaves_count, dtype=numpy.float64))
+        semitones  = 2.0 ** (numpy.arange(notes_per_octave) / float(notes_per_octave))
+        self.frequencies = oct_starts[:, None] * semitones[None, :]
+
+        # resolve the frequency of every note that fits in the table once and for all
+        self.note_frequencies = {
+            note: self.frequencies[location]
+            for (note, location) in _NOTES.items()
+            if location[1] < notes_per_octave }
 
 
     # read a note and get its value in Hertz
     def read_node(self, note: str) -> float:
-        if not self.pattern.match(note):
-            raise Exception("Could not read the note {}".format(note))
-
-        # convert the letter into a pitch and the number into an octave
-        n = note.encode()
-        pitch = (n[0] - 0x41) * 2 # 'A' = 0x41
-        octave = n[-1] - 0x31 # '1' = 0x31
-
-        # is there a '#' in the note ?
-        if len(note) == 3:
-            pitch += 1
-
         # recover the corresponding frequency value
-        return self.frequencies[octave, pitch]
+        frequency = self.note_frequencies.get(note)
+        if frequency is None:
+            if note in _NOTES:
+                raise Exception("The note {} is outside of the frequency table".format(note))
+            raise Exception("Could not read the note {}".format(note))
+        return frequency
 
 
 # convert the frequency into binary for NTSC platform
@@ -224,15 +316,5 @@ def encode_pal(frequency: float) -> int:
     return round((1662607.0 / frequency * 16.0) - 1.0)
 
 
-line_reader = LineReader()
-f = open('assets/ducktales.txt')
-lines = line_reader.read_file(f)
-
-gen = TreeGenerator()
-print(gen)
-
-try:
-    root = gen.hierarchize(lines)
-    print('Tree generated: {}'.format(root))
-except Exception as e:
-    print(e)
+if __name__ == '__main__':
+    main()
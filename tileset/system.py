@@ -2,14 +2,21 @@
     Define retro systems' configurations
 """
 
-import math
-
 from numpy  import ndarray
 from typing import Self
 
 # Define a system tile configuration
 class System:
 
+    # Fields of a system configuration
+    __slots__ = (
+        'name',
+        'palette_count', 'palette_size',
+        'tile_count', 'tile_width', 'tile_height',
+        'flipping_h', 'flipping_v',
+        'intertwined', 'bit_count', 'use_bitplanes',
+        '_pal_shape', '_tile_size', '_tileset_shape', '_flipping')
+
     # Store a list of systems
     SYSTEMS = []
 
@@ -35,6 +42,10 @@ class System:
 
         self.name = name
 
+        # palette entries are indexed with a whole number of bits
+        if pal_size <= 0 or pal_size & (pal_size - 1) != 0:
+            raise Exception(f"Palette size must be a power of two, got {pal_size}.")
+
         # check_palette
         self.palette_count = pal_count
         self.palette_size  = pal_size
@@ -50,9 +61,15 @@ class System:
 
         # bitplane
         self.intertwined   = intertwined
-        self.bit_count     = int(math.log2(pal_size))
+        self.bit_count     = (pal_size - 1).bit_length()
         self.use_bitplanes = use_bitplanes
 
+        # shapes queried for every image processed
+        self._pal_shape     = (pal_count, pal_size)
+        self._tile_size     = (tile_height, tile_width)
+        self._tileset_shape = (tile_count, tile_height, tile_width)
+        self._flipping      = (flip_v, flip_h)
+
         # Store the element in the appropriate list
         if is_sprite:
             System.CONFIG_SPRITES[self.name] = self
@@ -81,22 +98,19 @@ class System:
 
     # Check if the given palette is valid for this system
     def check_palette(self, palette: ndarray) -> bool:
-        pal_count = palette.shape[0]
-        pal_size  = palette.shape[1]
-        return (self.palette_count == pal_count and 
-                self.palette_size  == pal_size)
+        return palette.shape[:2] == self._pal_shape
 
     # Get the size of a tile
     def tile_size(self) -> tuple[int, int]:
-        return (self.tile_height, self.tile_width)
+        return self._tile_size
 
     # Get a tuple to allocate a tileset buffer
     def tileset_shape(self) -> tuple[int, int, int]:
-        return (self.tile_count, self.tile_height, self.tile_width)
+        return self._tileset_shape
     
     # Get flipping possibilities for this system
     def flipping(self) -> tuple[bool, bool]:
-        return (self.flipping_v, self.flipping_h)
+        return self._flipping
     
     # Get the size of the serialize tileset in bytes
     def serial_size(self) -> int:
@@ -104,12 +118,12 @@ class System:
 
 
     # Load system configs
-    @staticmethod
-    def get(name: str, is_sprite: bool = False) -> Self | None:
+    @classmethod
+    def get(cls, name: str, is_sprite: bool = False) -> Self | None:
         if is_sprite:
-            return System.CONFIG_SPRITES.get(name)
+            return cls.CONFIG_SPRITES.get(name)
         else:
-            return System.CONFIG_TILEMAPS.get(name)
+            return cls.CONFIG_TILEMAPS.get(name)
 
 
 # Nintendo Entertainment System
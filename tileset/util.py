@@ -9,7 +9,7 @@ from numpy import ndarray
 
 
 # Reshape the image into a matrix of tiles
-@njit(fastmath=True)
+@njit(cache=True)
 def cut_image_into_tiles(
     image     : ndarray,
     palettes  : ndarray,
@@ -39,6 +39,10 @@ def cut_image_into_tiles(
     output  = np.zeros((out_h, out_w, tile_h, tile_w), np.uint8)
     pal_map = np.zeros((out_h, out_w), np.uint8)
 
+    # Pack the colors once so that pixels are compared as single integers
+    packed_image    = pack_rgb(image)
+    packed_palettes = pack_rgb(palettes)
+
     # Copy each RGB pixel from the input image to its new location
     for iy in prange(out_h):
         for ix in prange(out_w):
@@ -47,7 +51,7 @@ def cut_image_into_tiles(
             x0 = ix * tile_w ; x1 = x0 + tile_w
 
             # Convert it into an indexed tile
-            (tile, pal_index) = identify_palette(image[y0:y1, x0:x1], palettes)
+            (tile, pal_index) = identify_palette(packed_image[y0:y1, x0:x1], packed_palettes)
             output [iy, ix] = tile
             pal_map[iy, ix] = pal_index
 
@@ -57,7 +61,7 @@ def cut_image_into_tiles(
 
 
 # Given a matrix of tiles, reshape it into a simple sequence
-@njit(fastmath=True)
+@njit(cache=True)
 def reshape_tileset(
     tilemap   : ndarray,
     set_shape : tuple[int, int, int],
@@ -66,7 +70,7 @@ def reshape_tileset(
     Reshape the tilemap into a tileset
 
     @type  tilemap: ndarray (mh, mw, th, tw) uint8
-    @param tilemap: The tilemap to reshape
+    @param tilemap: The tilemap to reshape, copied first if it is not C-contiguous
 
     @type  set_shape: (int, int, int)
     @param set_shape: Specify the shape of the tileset
@@ -74,31 +78,53 @@ def reshape_tileset(
     @rtype: ndarray (tc, th, tw) uint8
     @returns: The reshaped tileset
     """
-    row_length = tilemap.shape[1]
+    (map_h, map_w, tile_h, tile_w) = tilemap.shape
+    tile_count = map_h * map_w
 
-    # Allocate a buffer to store the generated tileset
+    # Allocate a buffer to store the generated tileset,
+    # tiles are stored row by row so the tilemap is copied in a single block,
+    # numba can only reshape contiguous arrays
     tileset = np.zeros(set_shape, np.uint8)
-    for iy, ix in np.ndindex(tilemap.shape[:2]):
-        tileset[ix + iy * row_length] = tilemap[iy, ix]
+    tileset[:tile_count] = np.ascontiguousarray(tilemap).reshape((tile_count, tile_h, tile_w))
 
     # Return the tileset as a sequence
     return tileset
 
 
 
+# Pack the RGB channels of a matrix of colors into integers
+@njit(cache=True)
+def pack_rgb(colors: ndarray) -> ndarray:
+    """
+    Pack each color into a single integer, extra channels are ignored
+
+    @type  colors: ndarray (h, w, c) uint8
+    @param colors: The colors to pack, the first three channels are red, green and blue
+
+    @rtype:   ndarray (h, w) uint32
+    @returns: The colors packed as 0x00RRGGBB
+    """
+    # numba promotes the shifts to signed integers, cast back to the documented type
+    packed = ((colors[:, :, 0].astype(np.uint32) << 16) |
+              (colors[:, :, 1].astype(np.uint32) <<  8) |
+               colors[:, :, 2].astype(np.uint32))
+    return packed.astype(np.uint32)
+
+
+
 # Given a tile which pixels are encoded as RGB values and a palette, try to 
 # identify a matching palette to use. If one is found, return the tile where each
 # pixel is identified as an index.
-@njit(fastmath=True)
+@njit(cache=True)
 def identify_palette(tile: ndarray, palettes: ndarray) -> tuple[ndarray, int]:
     """
     Try to find a palette that matches with the tile
 
-    @type  tile: ndarray (th, tw, 3) uint8
-    @param tile: The RGB tile to convert
+    @type  tile: ndarray (th, tw) uint32
+    @param tile: The tile to convert, with colors packed by pack_rgb
 
-    @type  palettes: ndarray (pc, ps, 3) uint8
-    @param palettes: The palette convert pixels from RGB to index
+    @type  palettes: ndarray (pc, ps) uint32
+    @param palettes: The palette convert pixels from RGB to index, packed by pack_rgb
 
     @rtype:   (ndarray (th, tw) uint8, int)
     @returns: The tile with indexes and the index of the palette identified
@@ -123,8 +149,7 @@ def identify_palette(tile: ndarray, palettes: ndarray) -> tuple[ndarray, int]:
                 # Check if the pixel color is part of the palette
                 # And if it is the case, store the index of the color
                 for ci in prange(pal_size):
-                    color = pal[ci]
-                    if cmp_rgb(pix, color):
+                    if pix == pal[ci]:
                         storage[pi, ty, tx] = ci
 
     # Now each storage cell should contains a tile definition where the pixel 
@@ -139,18 +164,8 @@ def identify_palette(tile: ndarray, palettes: ndarray) -> tuple[ndarray, int]:
 
 
 
-# Compare two RGB colors with an optional epsilon
-@njit(fastmath=True)
-def cmp_rgb(a: ndarray, b: ndarray, ep: int = 0) -> bool:
-    for i in range(3):
-        if abs(int(a[i]) - int(b[i])) > ep:
-            return False
-    return True
-
-
-
 # Reformat the tileset into an image with multiple variations
-@njit(fastmath=True)
+@njit(cache=True)
 def reformat_tileset(
     tileset       : ndarray, 
     palettes      : ndarray, 
@@ -213,16 +228,92 @@ def reformat_tileset(
 
 
 
+# Index the tiles stored in a tileset to find them back by their content
+def index_tileset(
+    tileset    : ndarray,
+    used_tiles : ndarray,
+    flipping   : tuple[bool, bool],
+    ) -> dict[bytes, tuple[int, int]]:
+    """
+    Index the tiles already stored in the tileset, with each of their allowed flipping
+
+    @type  tileset: ndarray (tc, th, tw) uint8
+    @param tileset: Tileset storing the tiles
+
+    @type  used_tiles: ndarray (tc) bool
+    @param used_tiles: Specify if a tile has been already assigned
+
+    @type  flipping: (bool, bool)
+    @param flipping: Allow flipping tiles vertically and/or horizontally
+
+    @rtype:   dict[bytes, (int, int)]
+    @returns: For each content, the tile index and flipping to reproduce it
+    """
+    index: dict[bytes, tuple[int, int]] = {}
+    for it in np.flatnonzero(used_tiles).tolist():
+        register_tile(index, tileset[it], it, flipping)
+    return index
+
+
+
+# Register a tile stored in the tileset into its index
+def register_tile(
+    index    : dict[bytes, tuple[int, int]],
+    tile     : ndarray,
+    location : int,
+    flipping : tuple[bool, bool],
+    ):
+    """
+    Register the tile with all the flipping combinations allowed
+    -   0  : match without flipping
+    -   1  : match with vertical   flipping
+    -   2  : match with horizontal flipping
+    -   3  : match with both       flipping
+
+    A tile flipped twice the same way is unchanged, so a tile matches a stored one
+    with some flipping if it is equal to the stored one with that same flipping.
+    The earliest location then the first flipping of that list takes precedence.
+
+    @type  index: dict[bytes, (int, int)]
+    @param index: The index to populate
+
+    @type  tile: ndarray (th, tw) uint8
+    @param tile: The tile stored
+
+    @type  location: int
+    @param location: Where the tile is stored in the tileset
+
+    @type  flipping: (bool, bool)
+    @param flipping: Allow flipping tiles vertically and/or horizontally
+    """
+    (flip_v, flip_h) = flipping
+
+    variants = [(0b00, tile)]
+    if flip_v:
+        variants.append((0b01, np.flipud(tile)))
+    if flip_h:
+        variants.append((0b10, np.fliplr(tile)))
+    if flip_v and flip_h:
+        variants.append((0b11, np.flip(tile)))
+
+    for (variant_flip, variant) in variants:
+        key   = variant.tobytes()
+        entry = (location, variant_flip)
+        if key not in index or entry < index[key]:
+            index[key] = entry
+
+
+
 # Given a pixel art and a palette, populate a tileset and identify the palette 
 # of each tile. Also for each tile replace the pixels RGB value by the 
 # corresponding index of the color in the palette selected.
-@njit(fastmath=True)
 def extract_tileset(
     tile_map   : ndarray,
     pal_map    : ndarray,
     flipping   : tuple[bool, bool],
     tileset    : ndarray,
     used_tiles : ndarray,
+    index      : dict[bytes, tuple[int, int]] | None = None,
     ) -> ndarray:
     """
     Given a pixel art and a palette, populate a tileset and identify the 
@@ -244,6 +335,9 @@ def extract_tileset(
     @type  used_tiles: ndarray (tc) bool
     @param used_tiles: Specify if a tile has been already assigned
 
+    @type  index: dict[bytes, (int, int)] | None
+    @param index: Tiles stored in the tileset, built by index_tileset
+
     @rtype:   ndarray (mh, mw, 3) uint16
     @returns: The pixel art converted into a tilemap with the following data:
     - tile index
@@ -251,87 +345,46 @@ def extract_tileset(
     - flipping
 
     The `tileset` and `used_tiles` are parameters to populate but they may contain initial values.
+    The `index` must describe the content of the `tileset` with the same `flipping`, pass the same
+    one to every call sharing a tileset so that it is not rebuilt each time. If omitted it is built
+    from the tileset.
     """
 
     # Get the size of the image to iterate on
     map_h = tile_map.shape[0]
     map_w = tile_map.shape[1]
 
-    # Get the size of the tileset (number of individual tiles)
-    size = used_tiles.shape[0]
-
-    # Get flipping options
-    flip_v = flipping[0]
-    flip_h = flipping[1]
-
     # Allocate 16 bits to account for systems which support more than 256 tiles
     output = np.zeros((map_h, map_w, 3), np.uint16)
 
-    # Allocate a buffer to check if a given tile matches with one in the tileset
-    # - (-1) : no match
-    # -   0  : match without flipping
-    # -   1  : match with vertical   flipping
-    # -   2  : match with horizontal flipping
-    # -   3  : match with both       flipping
-    buffer = np.full(size, -1, np.int8)
+    # Index the tiles already stored in the tileset by their content
+    if index is None:
+        index = index_tileset(tileset, used_tiles, flipping)
+
+    # Locations where new tiles can be stored, in order
+    free_tiles = iter(np.flatnonzero(~used_tiles).tolist())
 
     # Iterate over each tile in the image
-    for iy in prange(map_h):
-        for ix in prange(map_w):
+    for iy in range(map_h):
+        for ix in range(map_w):
             tile = tile_map[iy, ix]
 
-            # Check if the tile is already in the tileset
-            for it in prange(size):
-
-                # Reset the buffer to reuse it
-                buffer[it] = -1
-
-                # Test each tile that already exists in the tileset
-                if used_tiles[it]:
-
-                    # prepare the reference tile with all flipping combinations
-                    tile0: ndarray = tileset[it]
-                    tile1 = np.flipud(tile0)
-                    tile2 = np.fliplr(tile0)
-                    tile3 = np.flip(tile0)
-
-                    # Given initial parameters, try to find a match
-                    if np.array_equal(tile, tile0):
-                        buffer[it] = 0b00
-                    elif flip_v and np.array_equal(tile, tile1):
-                        buffer[it] = 0b01
-                    elif flip_h and np.array_equal(tile, tile2):
-                        buffer[it] = 0b10
-                    elif flip_v and flip_h and np.array_equal(tile, tile3):
-                        buffer[it] = 0b11
-
-            # get values to store in the output map
-            tile_index = -1
-            flipping   = -1
-
-            # One (or more) of the tiles match
-            if np.any(buffer != -1):
-                for it in range(size):
-                    has_match = buffer[it]
-                    if has_match != -1:
-                        tile_index = it
-                        flipping   = has_match
-                        break
-
-            # If the tile is new try to find a location where to store it
-            else:
-                for it in range(size):
-                    if not used_tiles[it]:
-                        tile_index = it
-                        flipping   = 0
-
-                        # Store the new tile and mark the location as used
-                        tileset   [it] = tile
-                        used_tiles[it] = True
-                        break
-            
+            # Look for the earliest tile in the tileset matching the tile with some flipping
+            (tile_index, flipping_used) = index.get(tile.tobytes(), (-1, 0))
+
+            # If the tile is new store it in the first location available
+            if tile_index == -1:
+                tile_index = next(free_tiles, -1)
+                if tile_index == -1:
+                    raise Exception("Not enough space left in the tileset to store a new tile.")
+
+                # Store the new tile and mark the location as used
+                tileset   [tile_index] = tile
+                used_tiles[tile_index] = True
+                register_tile(index, tile, tile_index, flipping)
+
             # store the tuple in the output
-            output[iy, ix] = np.array([tile_index, pal_map[iy, ix], flipping])
+            output[iy, ix] = (tile_index, pal_map[iy, ix], flipping_used)
 
     # return the output
-    return output
\ No newline at end of file
+    return output
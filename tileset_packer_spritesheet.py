@@ -12,7 +12,7 @@ import imageio.v3 as iio
 from os             import path
 from numpy          import ndarray
 from tileset.system import System
-from tileset.util   import cut_image_into_tiles, reformat_tileset, extract_tileset
+from tileset.util   import cut_image_into_tiles, reformat_tileset, extract_tileset, index_tileset
 from dataclasses    import dataclass
 from configargparse import ArgParser
 
@@ -156,27 +156,22 @@ class Frame:
         @returns: Dictionary that can be trivially serialized as JSON
         """
 
-        # Metasprites are made of multiple hardware sprites
-        sprites: list[dict] = []
-
-        # Iterate over the tiles in the map
-        for iy, ix in np.ndindex(indexed_map.shape[:2]):
+        # Find the tiles which are not empty, in the order of the map
+        (ys, xs) = np.nonzero(indexed_map[:, :, 0] != empty_tile)
 
-            # Read tile data
-            tile: ndarray = indexed_map[iy, ix]
-            tile_index = int(tile[0])
-            palette    = int(tile[1])
-            flipping   = int(tile[2])
+        # Read tile data and compute the position of each sprite at once
+        tiles = indexed_map[ys, xs].tolist()
+        pos_y = (ys * tile_size[0] - origin_offset[0]).tolist()
+        pos_x = (xs * tile_size[1] - origin_offset[1]).tolist()
 
-            # If the tile is empty, move on to the next one
-            if tile_index == empty_tile: continue
-
-            # Compose a sprite
+        # Metasprites are made of multiple hardware sprites
+        sprites: list[dict] = []
+        for (tile_index, palette, flipping), y, x in zip(tiles, pos_y, pos_x):
             sprites.append({
                 'tile'    : tile_index,
                 'palette' : palette,
-                'y'       : int(iy * tile_size[0] - origin_offset[0]),
-                'x'       : int(ix * tile_size[1] - origin_offset[1]),
+                'y'       : y,
+                'x'       : x,
                 'flip_v'  : (flipping & 0b01) != 0,
                 'flip_h'  : (flipping & 0b10) != 0,
             })
@@ -254,7 +249,8 @@ class Sequence:
         palettes   : ndarray,
         system     : System,
         tileset    : ndarray,
-        used_tiles : ndarray):
+        used_tiles : ndarray,
+        index      : dict[bytes, tuple[int, int]]):
         """
         Use the provided image to generate a sequence of animated metasprites
 
@@ -272,6 +268,9 @@ class Sequence:
 
         @type  used_tiles: ndarray (tc) bool
         @param used_tiles: Specify if a tile has been already assigned
+
+        @type  index: dict[bytes, (int, int)]
+        @param index: Tiles stored in the tileset, built by index_tileset
         """
 
         # make lists to store the animation frames
@@ -295,7 +294,7 @@ class Sequence:
             # shortcut for quickly processing the tiles
             flipping = system.flipping()
             func = lambda tile_map, pal_map: extract_tileset(
-                tile_map, pal_map, flipping, tileset, used_tiles)
+                tile_map, pal_map, flipping, tileset, used_tiles, index)
 
             # identify tiles with all flipping configurations
             self.frames.append(func(tile_map0, pal_map0))
@@ -433,7 +432,8 @@ class SpriteSheet:
         palettes   : ndarray, 
         system     : System,
         tileset    : ndarray,
-        used_tiles : ndarray):
+        used_tiles : ndarray,
+        index      : dict[bytes, tuple[int, int]]):
         """
         Use the provided images to generate a tileset
 
@@ -448,11 +448,14 @@ class SpriteSheet:
 
         @type  used_tiles: ndarray (tc) bool
         @param used_tiles: Specify if a tile has been already assigned
+
+        @type  index: dict[bytes, (int, int)]
+        @param index: Tiles stored in the tileset, built by index_tileset
         """
 
         # Generate frames for each sequence and populate the tileset
         for sequence in self.sequences:
-            sequence.process(self.image, palettes, system, tileset, used_tiles)
+            sequence.process(self.image, palettes, system, tileset, used_tiles, index)
 
 
     # Process the image that was loaded
@@ -514,9 +517,12 @@ def process(
     used_tiles = np.zeros(shape[0], np.bool )
     used_tiles[empty_tile] = True
 
+    # Index the tiles stored so far, shared by every frame processed
+    index = index_tileset(tileset, used_tiles, system.flipping())
+
     # Process the spritesheets
     for spritesheet in spritesheets:
-        spritesheet.process(palettes, system, tileset, used_tiles)
+        spritesheet.process(palettes, system, tileset, used_tiles, index)
 
     # remove the extra tile
     return tileset[:-1]
@@ -14,7 +14,7 @@ import imageio.v3 as iio
 
 from numpy          import ndarray
 from tileset.system import System
-from tileset.util   import cut_image_into_tiles, reformat_tileset, extract_tileset
+from tileset.util   import cut_image_into_tiles, reformat_tileset, extract_tileset, index_tileset
 from dataclasses    import dataclass
 from configargparse import ArgParser
 
@@ -160,20 +160,18 @@ def process(
         char_end = char_offset + (
             char_size if char_size > -1 else char_map.shape[0] * char_map.shape[1])
 
-        # iterate over the character map and store the tiles into the tileset
-        for iy, ix in np.ndindex(char_map.shape[:2]):
-            # write characters into the tileset until we reach the last character
-            if char_offset >= char_end:
-                break
-            tileset   [char_offset] = char_map[iy, ix]
-            used_tiles[char_offset] = True
-            char_offset += 1
+        # store the characters row by row into the tileset until we reach the last one
+        char_count = max(0, min(char_end - char_offset, char_map.shape[0] * char_map.shape[1]))
+        char_tiles = char_map.reshape((-1,) + char_map.shape[2:])
+        tileset   [char_offset : char_offset + char_count] = char_tiles[:char_count]
+        used_tiles[char_offset : char_offset + char_count] = True
 
-    # Process the actual images
+    # Process the actual images, sharing the index of the tiles stored between them
     results = []
+    index   = index_tileset(tileset, used_tiles, system.flipping())
     for image in images:
         (tile_map, pal_map) = cut_image_into_tiles(image, palettes, system.tile_size())
-        results.append(extract_tileset(tile_map, pal_map, system.flipping(), tileset, used_tiles))
+        results.append(extract_tileset(tile_map, pal_map, system.flipping(), tileset, used_tiles, index))
 
     # We return the optimized tileset and the tilemap made of indexes
     return (tileset, results)
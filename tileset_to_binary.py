@@ -111,8 +111,7 @@ class Config:
 
         # Write the result to the output file
         with open(self.output, 'wb') as file:
-            for byte in serial:
-                file.write(byte)
+            file.write(serial.tobytes())
 
 
 # Process the data
@@ -169,7 +168,7 @@ def process(image: ndarray, palettes: ndarray, system: System) -> ndarray:
 
 
 # Convert the tileset into bitplanes to be then serialized into the system's binary format
-@njit(fastmath=True)
+@njit(cache=True)
 def convert_to_bitplanes(tileset: ndarray, bit_count: int) -> ndarray:
     """
     Convert the tileset into bitplanes.
@@ -229,7 +228,7 @@ def convert_to_bitplanes(tileset: ndarray, bit_count: int) -> ndarray:
 
 
 # Serialize bitplanes for NES
-@njit(fastmath=True)
+@njit(cache=True)
 def serial_nes(bitplanes: ndarray) -> ndarray:
     """
     Serialize the two bitplanes for usage with the NES
@@ -261,7 +260,7 @@ def serial_nes(bitplanes: ndarray) -> ndarray:
 # Serialize bitplanes by intertwining them
 # two  by two  for SNES, GameBoy, GameBoy Color and PC-Engine
 # four by four for Master System, Game Gear and Wonderswan Color
-@njit(fastmath=True)
+@njit(cache=True)
 def serial_intertwined(bitplanes: ndarray, intertwine: int) -> ndarray:
     """
     Serialize the bitplanes by intertwining rows
@@ -299,7 +298,7 @@ def serial_intertwined(bitplanes: ndarray, intertwine: int) -> ndarray:
 # 2-bits per pixel for Virtual Boy and NeoGeo Pocket Color
 # 4-bits per pixel for Megadrive
 # 8-bits per pixel for SNES Mode7
-@njit(fastmath=True)
+@njit(cache=True)
 def serial_linear(tileset: ndarray, bit_count: int, swap_byte: bool = False) -> ndarray:
     """
     Serialize the bitplanes linearly
@@ -360,7 +359,7 @@ def serial_linear(tileset: ndarray, bit_count: int, swap_byte: bool = False) ->
 
 
 # Serialize tileset for SNES mode 7
-@njit(fastmath=True)
+@njit(cache=True)
 def serial_snes_mode7(tileset: ndarray) -> ndarray:
     """
     Serialize the tileset for the SNES mode 7
@@ -395,7 +394,7 @@ def serial_snes_mode7(tileset: ndarray) -> ndarray:
 
 
 # Serialize a tileset for the Megadrive
-@njit(fastmath=True)
+@njit(cache=True)
 def serial_megadrive(tileset: ndarray) -> ndarray:
     """
     Serialize the tileset for the megadrive
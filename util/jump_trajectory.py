@@ -9,6 +9,18 @@ from math import sqrt
 # Compute a jump trajectory from four parameters
 class JumpTrajectory:
 
+    # For each combination of parameters provided, compute the four parameters
+    # from the two known ones: (height, time, impulse, gravity)
+    _SOLVERS = {
+        0b0011: lambda h, t, i, g: (h, t, 2.0 * h / t, -2.0 * h / t ** 2),
+        0b0101: lambda h, t, i, g: (h, 2.0 * h / i, i, -0.5 * i ** 2 / h),
+        0b1001: lambda h, t, i, g: (h, sqrt(2.0 * h / g), sqrt(2.0 * h * g), g),
+        0b0110: lambda h, t, i, g: (0.5 * t * i, t, i, -i / t),
+        0b1010: lambda h, t, i, g: (-0.5 * g * t ** 2, t, -g * t, g),
+        0b1100: lambda h, t, i, g: (-0.5 * i ** 2 / g, -i / g, i, g),
+    }
+
+
     # Compute a trajectory from a set of four parameters
     def __init__(self,
         height  : float | None,
@@ -18,61 +30,24 @@ class JumpTrajectory:
     ):
 
         # Check which parameters where provided
-        mask = 0b0000
-
-        # check a parameter
-        def check(n: float | None, m: int, neg: bool = False) -> bool:
-            nonlocal mask
-            if n is not None:
-                mask |= m
-                return (n < 0.0) if neg else (n > 0.0)
-            return True
-        
-        # check each of the parameters
-        if not check(height , 0b0001): raise Exception("Height cannot be null or negative")
-        if not check(time   , 0b0010): raise Exception("Time cannot be null or negative")
-        if not check(impulse, 0b0100): raise Exception("Impulse cannot be null or negative")
-        if not check(gravity, 0b1000, True): raise Exception("Gravity cannot be null or positive")
-
-        if   mask == 0b0011:
-            self.height  =  height
-            self.time    =  time
-            self.impulse =  2.0 * height / time
-            self.gravity = -2.0 * height / time ** 2
-
-        elif mask == 0b0101:
-            self.height  =  height
-            self.time    =  2.0 * height / impulse
-            self.impulse =  impulse
-            self.gravity = -0.5 * impulse ** 2 / height
-
-        elif mask == 0b1001:
-            self.height  = height
-            self.time    = sqrt(2.0 * height / gravity)
-            self.impulse = sqrt(2.0 * height * gravity)
-            self.gravity = gravity
-
-        elif mask == 0b0110:
-            self.height  =  0.5 * time * impulse
-            self.time    =  time
-            self.impulse =  impulse
-            self.gravity = -impulse / time
-
-        elif mask == 0b1010:
-            self.height  = -0.5 * gravity * time ** 2
-            self.time    =  time
-            self.impulse = -gravity * time
-            self.gravity =  gravity
-
-        elif mask == 0b1100:
-            self.height  = -0.5 * impulse ** 2 / gravity
-            self.time    = -impulse / gravity
-            self.impulse =  impulse
-            self.gravity =  gravity
-
-        else:
+        mask = ((height  is not None)      |
+                (time    is not None) << 1 |
+                (impulse is not None) << 2 |
+                (gravity is not None) << 3)
+
+        # check each of the parameters provided
+        if height  is not None and not (height  > 0.0): raise Exception("Height cannot be null or negative")
+        if time    is not None and not (time    > 0.0): raise Exception("Time cannot be null or negative")
+        if impulse is not None and not (impulse > 0.0): raise Exception("Impulse cannot be null or negative")
+        if gravity is not None and not (gravity < 0.0): raise Exception("Gravity cannot be null or positive")
+
+        # compute the missing parameters from the ones provided
+        solver = JumpTrajectory._SOLVERS.get(mask)
+        if solver is None:
             raise Exception("Unsupported combination of parameters where provided")
 
+        (self.height, self.time, self.impulse, self.gravity) = solver(height, time, impulse, gravity)
+
 
 
 # Compute ascending time and descending time variation for jump
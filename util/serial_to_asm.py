@@ -2,6 +2,10 @@
     Serialize a sequence of bytes into ASM syntax
 """
 
+import numpy as np
+
+from io                  import StringIO
+from typing              import TextIO
 from numpy               import ndarray
 from util.text_formatter import TextFormatter
 
@@ -59,6 +63,7 @@ class SerialToAsm:
 
         # Select the hexadecimal notation to use
         self.format = SerialToAsm._FORMAT_HEX_UPPER if uppercase else SerialToAsm._FORMAT_HEX_LOWER
+        self.uppercase = uppercase
 
         # Select how to annotate the hexadecimal numbers
         if   notation == '0x' : self.annote = lambda s: f'0x{s}'
@@ -66,6 +71,11 @@ class SerialToAsm:
         elif notation == 'h'  : self.annote = lambda s: f'{s}h'
         else: raise Exception(f"Unknown hexadecimal notation {notation}.")
 
+        # Precompute the token of each byte value,
+        # so that bytes are serialized with a lookup rather than formatted one by one
+        self.byte_tokens = np.array([self.annote(self.format[0](n)) for n in range(256)], dtype=object)
+        self.byte_token_map = dict(enumerate(self.byte_tokens.tolist()))
+
         # If provided store a text formatter
         self.text_format = text_format
 
@@ -82,38 +92,78 @@ class SerialToAsm:
 
 
     # Serialize a matrix
-    def serialize_matrix(self, matrix: ndarray) -> str:
+    def serialize_matrix(self, matrix: ndarray, out: TextIO | None = None) -> str | None:
         """
         Serialize a matrix of N-dimensions to assembly syntax.
 
         @type  matrix: ndarray
         @param matrix: A matrix of N-dimension storing unsigned integers
 
-        @rtype: str
-        @returns: Assembly syntax that can be embedded using Jinja2
-        """
+        @type  out: TextIO | None
+        @param out: Stream to write the result to, instead of returning it
 
-        # Get the number of dimensions in the matrix
-        # We have three cases to handle: 1, 2 or N
-        dim = len(matrix.shape)
+        @rtype: str | None
+        @returns: Assembly syntax that can be embedded using Jinja2, None if written to a stream
+        """
 
         # cannot handle matrix without any dimensions
-        if dim <= 0:
+        if len(matrix.shape) <= 0:
             raise Exception("Cannot operate on matrix of null dimension")
 
+        # format every element of the matrix at once
+        idx = self._idx_size(matrix.dtype.itemsize)
+        tkn = self._matrix_tokens(matrix, idx)
+
+        # write directly into the stream if one is provided
+        if out is not None:
+            self._write_matrix(out, tkn, self.labels[idx])
+            return None
+
+        # otherwise write every line into a single buffer
+        buffer = StringIO()
+        self._write_matrix(buffer, tkn, self.labels[idx])
+        return buffer.getvalue()
+
+
+    # Write a matrix of tokens line by line
+    def _write_matrix(self, out: TextIO, tokens: ndarray, label: str):
+        # Get the number of dimensions in the matrix
+        # We have two cases to handle: 1 or N
+        dim = len(tokens.shape)
+
         # generate a single line
-        elif dim == 1:
-            idx = self._idx_size(matrix.dtype.itemsize)
-            lbl = self.labels[idx]
-            fmt = self.format[idx]
-            tkn = [self.annote(fmt(n)) for n in matrix]
-            return '{} {}'.format(lbl, ', '.join(tkn))
+        if dim == 1:
+            out.write(label)
+            out.write(' ')
+            out.write(', '.join(tokens.tolist()))
 
-        # generate paragraphs
+        # generate paragraphs separated by as many line returns as nested dimensions
         else:
             sep = '\n' * (dim - 1)
-            blk = [self.serialize_matrix(sub) for sub in matrix]
-            return sep.join(blk)
+            for i, sub in enumerate(tokens):
+                if i > 0: out.write(sep)
+                self._write_matrix(out, sub, label)
+
+
+    # Format each element of a matrix into a token
+    def _matrix_tokens(self, matrix: ndarray, idx: int) -> ndarray:
+        # bytes are gathered from the lookup table
+        if matrix.dtype == np.uint8:
+            return self.byte_tokens[matrix]
+
+        # wider unsigned integers are converted to hexadecimal by a single call to bytes.hex
+        elif matrix.dtype.kind == 'u':
+            width  = 2 * matrix.dtype.itemsize
+            digits = matrix.astype(matrix.dtype.newbyteorder('>')).tobytes().hex()
+            if self.uppercase:
+                digits = digits.upper()
+            tkn = [self.annote(digits[i : i + width]) for i in range(0, len(digits), width)]
+
+        else:
+            fmt = self.format[idx]
+            tkn = [self.annote(fmt(n)) for n in matrix.flat]
+
+        return np.array(tkn, dtype=object).reshape(matrix.shape)
 
 
     # Serialize list of arbitrary size
@@ -140,8 +190,14 @@ class SerialToAsm:
 
         idx = self._idx_size(intsize)
         lbl = self.labels[idx]
-        fmt = self.format[idx]
-        tkn = [self.annote(fmt(n)) for n in array]
+        if idx == 0:
+            # any other value is formatted like a wider integer would be
+            fmt = self.format[idx]
+            get = self.byte_token_map.get
+            tkn = [get(n) or self.annote(fmt(n)) for n in array]
+        else:
+            fmt = self.format[idx]
+            tkn = [self.annote(fmt(n)) for n in array]
 
         # add a zero guard if requested
         if zeroguard: tkn.append('0')
@@ -172,7 +228,6 @@ class SerialToAsm:
             raise Exception("No text formatter defined for this assembly serializer")
 
         lbl = self.labels[0]
-        fmt = self.format[0]
 
         # generate lines to serialize
         lines = self.text_format.convert(text)
@@ -181,7 +236,7 @@ class SerialToAsm:
         output = []
         for line in lines:
             # serialize the line with a zero guard at the end
-            tkn = [self.annote(fmt(n)) for n in line]
+            tkn = self.byte_tokens[np.frombuffer(line, np.uint8)].tolist()
             ent = '{} {}, 0'.format(lbl, ', '.join(tkn))
             output.append(ent)
 
@@ -2,6 +2,10 @@
     Serialize a sequence of bytes for common programming languages
 """
 
+import numpy as np
+
+from io                  import StringIO
+from typing              import TextIO
 from numpy               import ndarray
 from util.text_formatter import TextFormatter
 
@@ -37,12 +41,18 @@ class SerialToLang:
 
         # Select the hexadecimal notation to use
         self.format = SerialToLang._FORMAT_HEX_UPPER if uppercase else SerialToLang._FORMAT_HEX_LOWER
+        self.uppercase = uppercase
 
-        # Which set of labels to use
-        if   braces == '{}': self.braces = '{{ {} }}'
-        elif braces == '[]': self.braces = '[ {} ]'
+        # Which set of braces to use, opening and closing
+        if   braces == '{}': self.braces = ('{ ', ' }')
+        elif braces == '[]': self.braces = ('[ ', ' ]')
         else: raise Exception(f"Unknown label set {braces}.")
 
+        # Precompute the token of each byte value,
+        # so that bytes are serialized with a lookup rather than formatted one by one
+        self.byte_tokens = np.array([f'0x{self.format[0](n)}' for n in range(256)], dtype=object)
+        self.byte_token_map = dict(enumerate(self.byte_tokens.tolist()))
+
         # If provided store a text formatter
         self.text_format = text_format
 
@@ -59,35 +69,75 @@ class SerialToLang:
 
 
     # Serialize a matrix
-    def serialize_matrix(self, matrix: ndarray) -> str:
+    def serialize_matrix(self, matrix: ndarray, out: TextIO | None = None) -> str | None:
         """
         Serialize a matrix of N-dimensions to assembly syntax.
 
         @type  matrix: ndarray
         @param matrix: A matrix of N-dimension storing unsigned integers
 
-        @rtype: str
-        @returns: Assembly syntax that can be embedded using Jinja2
-        """
+        @type  out: TextIO | None
+        @param out: Stream to write the result to, instead of returning it
 
-        # Get the number of dimensions in the matrix
-        # We have three cases to handle: 1, 2 or N
-        dim = len(matrix.shape)
+        @rtype: str | None
+        @returns: Assembly syntax that can be embedded using Jinja2, None if written to a stream
+        """
 
         # cannot handle matrix without any dimensions
-        if dim <= 0:
+        if len(matrix.shape) <= 0:
             raise Exception("Cannot operate on matrix of null dimension")
 
+        # format every element of the matrix at once
+        tkn = self._matrix_tokens(matrix, self._idx_size(matrix.dtype.itemsize))
+
+        # write directly into the stream if one is provided
+        if out is not None:
+            self._write_matrix(out, tkn)
+            return None
+
+        # otherwise write the nested arrays into a single buffer
+        buffer = StringIO()
+        self._write_matrix(buffer, tkn)
+        return buffer.getvalue()
+
+
+    # Write a matrix of tokens as nested arrays
+    def _write_matrix(self, out: TextIO, tokens: ndarray):
+        (open_brace, close_brace) = self.braces
+        out.write(open_brace)
+
         # generate a single line
-        elif dim == 1:
-            fmt = self.format[self._idx_size(matrix.dtype.itemsize)]
-            tkn = [f'0x{fmt(n)}' for n in matrix]
-            return self.braces.format(', '.join(tkn))
+        if len(tokens.shape) == 1:
+            out.write(', '.join(tokens.tolist()))
 
-        # generate paragraphs
+        # generate an array for each sub-matrix
         else:
-            tkn = [self.serialize_matrix(matrix[i]) for i in range(matrix.shape[0])]
-            return self.braces.format(',\n'.join(tkn))
+            for i, sub in enumerate(tokens):
+                if i > 0: out.write(',\n')
+                self._write_matrix(out, sub)
+
+        out.write(close_brace)
+
+
+    # Format each element of a matrix into a token
+    def _matrix_tokens(self, matrix: ndarray, idx: int) -> ndarray:
+        # bytes are gathered from the lookup table
+        if matrix.dtype == np.uint8:
+            return self.byte_tokens[matrix]
+
+        # wider unsigned integers are converted to hexadecimal by a single call to bytes.hex
+        elif matrix.dtype.kind == 'u':
+            width  = 2 * matrix.dtype.itemsize
+            digits = matrix.astype(matrix.dtype.newbyteorder('>')).tobytes().hex()
+            if self.uppercase:
+                digits = digits.upper()
+            tkn = ['0x' + digits[i : i + width] for i in range(0, len(digits), width)]
+
+        else:
+            fmt = self.format[idx]
+            tkn = [f'0x{fmt(n)}' for n in matrix.flat]
+
+        return np.array(tkn, dtype=object).reshape(matrix.shape)
 
 
     # Serialize list of arbitrary size
@@ -112,16 +162,24 @@ class SerialToLang:
         @returns: Assembly syntax that can be embedded using Jinja2
         """
 
-        fmt = self.format[self._idx_size(intsize)]
+        idx = self._idx_size(intsize)
 
         # generate lines to serialize
-        tkn = [f'0x{fmt(n)}' for n in array]
+        if idx == 0:
+            # any other value is formatted like a wider integer would be
+            fmt = self.format[idx]
+            get = self.byte_token_map.get
+            tkn = [get(n) or f'0x{fmt(n)}' for n in array]
+        else:
+            fmt = self.format[idx]
+            tkn = [f'0x{fmt(n)}' for n in array]
 
         # add a zero guard if requested
         if zeroguard: tkn.append('0')
 
         # create a paragraph
-        return self.braces.format(', '.join(tkn))
+        (open_brace, close_brace) = self.braces
+        return open_brace + ', '.join(tkn) + close_brace
 
 
     # Serialize a string
@@ -145,7 +203,7 @@ class SerialToLang:
         if self.text_format is None:
             raise Exception("No text formatter defined for this assembly serializer")
 
-        fmt = self.format[0]
+        (open_brace, close_brace) = self.braces
 
         # generate lines to serialize
         lines = self.text_format.convert(text)
@@ -154,11 +212,11 @@ class SerialToLang:
         output = []
         for line in lines:
             # serialize the line with a zero guard at the end
-            tkn = [self.annote(fmt(n)) for n in line]
+            tkn = self.byte_tokens[np.frombuffer(line, np.uint8)].tolist()
             tkn.append('0')
-            ent = self.braces.format(', '.join(tkn))
+            ent = open_brace + ', '.join(tkn) + close_brace
             output.append(ent)
 
         # create a paragraph
-        return self.braces.format(',\n'.join(output))
+        return open_brace + ',\n'.join(output) + close_brace
 
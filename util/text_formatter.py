@@ -4,9 +4,6 @@
 
 import numpy as np
 
-from numba import njit, prange
-from numpy import ndarray
-
 
 # Configuration for character remapping
 class TextFormatter:
@@ -45,6 +42,9 @@ class TextFormatter:
                 # map the ASCII character to a target index
                 self.remap[char] = start + i
 
+        # translation table for bytes.translate, built once the mapping is complete
+        self.translation = self.remap.tobytes()
+
         self.max_length = max_length
 
 
@@ -55,46 +55,12 @@ class TextFormatter:
         # Split the text into lines at explicit line returns
         # and also when the line is too long.
         for line in text.splitlines():
-            bline = line.encode()
-            for i in range(0, len(bline), self.max_length):
+            # remap the characters of the whole line into the target encoding
+            bline = line.encode().translate(self.translation)
 
-                # cut the line and convert it into a numpy array
-                # remap the characters into the target encoding
-                # and add the line to the list
-                buffer = np.frombuffer(bline[i:i+self.max_length], dtype=np.uint8)
-                result = _remap_characters(buffer, self.remap)
-                output.append(result.tobytes())
+            # cut the line and add the pieces to the list
+            for i in range(0, len(bline), self.max_length):
+                output.append(bline[i:i+self.max_length])
 
         return output
 
-
-
-# Remap characters
-@njit(fastmath=True)
-def _remap_characters(text: ndarray, remap: ndarray) -> ndarray:
-    """
-    Read the provided text using ASCII encoding and remap the characters into the target encoding.
-
-    @type  text: ndarray (n) uint8
-    @param text: The input text encoded in ASCII
-
-    @type  remap: ndarray (r) uint8
-    @param remap: Remapping rules, for each ASCII character, specify the byte to replace it with
-
-    @rtype:   ndarray (n) uint8
-    @returns: The output text
-    """
-
-    # remap struct should have an entry for each ASCII character
-    if remap.shape[0] >= 256:
-        raise Exception("Invalid remap array")
-
-    # allocate a buffer to store the result
-    size   = text.shape[0]
-    output = np.zeros(size, dtype=np.uint8)
-
-    # convert the characters
-    for i in prange(size):
-        output[i] = remap[text[i]]
-    
-    return output
\ No newline at end of file